@@ -10,10 +10,10 @@ SELECT
 --  , syscall_arg0
 --  , profile_ustack
 --  , profile_kstack
---  , REGEXP_REPLACE(REGEXP_REPLACE(offcpu_kstack, '^->0x[0-9a-f]+', ''), '\+[0-9]+','','g') offcpu_kstack
-  , REGEXP_REPLACE(REGEXP_REPLACE(offcpu_ustack, '^->0x[0-9a-f]+', ''), '\+[0-9]+','','g') offcpu_ustack
---  , REGEXP_REPLACE(REGEXP_REPLACE(syscall_ustack, '^->0x[0-9a-f]+', ''), '\+[0-9]+','','g') syscall_ustack
---  , REGEXP_REPLACE(REGEXP_REPLACE(syscall_ustack, '^->0x[0-9a-f]+', ''), '\+[0-9]+','','g') syscall_ustack
+--  , REGEXP_REPLACE(offcpu_kstack, '^->0x[0-9a-f]+|\+[0-9]+', '', 'g') offcpu_kstack
+  , REGEXP_REPLACE(offcpu_ustack, '^->0x[0-9a-f]+|\+[0-9]+', '', 'g') offcpu_ustack
+--  , REGEXP_REPLACE(syscall_ustack, '^->0x[0-9a-f]+|\+[0-9]+', '', 'g') syscall_ustack
+--  , REGEXP_REPLACE(syscall_ustack, '^->0x[0-9a-f]+|\+[0-9]+', '', 'g') syscall_ustack
 FROM
     READ_CSV('xcapture_20231019_05.csv', auto_detect=true) samples
 RIGHT OUTER JOIN
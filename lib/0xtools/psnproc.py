@@ -43,7 +43,8 @@ class ProcSource:
 
         # find schema columns
         sample_cols = [('event_time', str), ('pid', int), ('task', int)]
-        source_cols = [c for c in self.available_columns if c[col_name_i] in self.stored_column_names and c[col_name_i] not in dict(sample_cols) and c[1] is not None]
+        sample_col_names = set([c[col_name_i] for c in sample_cols])
+        source_cols = [c for c in self.available_columns if c[col_name_i] in self.stored_column_names and c[col_name_i] not in sample_col_names and c[1] is not None]
         self.schema_columns = sample_cols + source_cols
 
         column_indexes = dict([(c[col_name_i], c[source_i]) for c in self.available_columns])
@@ -174,7 +175,7 @@ trim_comm = re.compile(r'\d+')
 
 stat = ProcSource('stat', '/proc/%s/task/%s/stat', [
     ('pid', int, 0),
-    ('comm', str, 1, lambda c: re.sub(trim_comm, '*', c)),
+    ('comm', str, 1, lambda c: trim_comm.sub('*', c)),
     ('comm2', str, 1),
     ('state_id', str, 2),
     ('state', str, 2, lambda state_id: process_state_name.get(state_id, state_id)),
@@ -323,8 +324,11 @@ def extract_system_call_ids(unistd_64_fh):
     #  #define __NR_mount 40
     #  #define __NR3264_truncate 45
 
+    # the header is read once, a second readlines() on the same handle would return nothing
+    lines = unistd_64_fh.readlines()
+
     for name_prefix in ['__NR_', '__NR3264_']:
-        for line in unistd_64_fh.readlines():
+        for line in lines:
             tokens = line.split()
             if tokens and len(tokens) == 3 and tokens[0] == '#define':
                 _, s_name, s_id = tokens
@@ -362,44 +366,44 @@ syscall_id_to_name = get_system_call_names()
 #syscall_name_to_id = dict((y,x) for x,y in syscall_id_to_name.iteritems())
 syscall_name_to_id = dict((y,x) for x,y in syscall_id_to_name.items())
 
-syscalls_with_fd_arg = set([                   
-    syscall_name_to_id.get('read'       , 'N/A')       
-  , syscall_name_to_id.get('write'      , 'N/A')       
-  , syscall_name_to_id.get('pread64'    , 'N/A')       
-  , syscall_name_to_id.get('pwrite64'   , 'N/A')       
-  , syscall_name_to_id.get('fsync'      , 'N/A')       
-  , syscall_name_to_id.get('fdatasync'  , 'N/A')       
-  , syscall_name_to_id.get('recvfrom'   , 'N/A')       
-  , syscall_name_to_id.get('sendto'     , 'N/A')       
-  , syscall_name_to_id.get('recvmsg'    , 'N/A')       
-  , syscall_name_to_id.get('sendmsg'    , 'N/A')       
-  , syscall_name_to_id.get('epoll_wait' , 'N/A')       
-  , syscall_name_to_id.get('ioctl'      , 'N/A')       
-  , syscall_name_to_id.get('accept'     , 'N/A')       
-  , syscall_name_to_id.get('accept4'    , 'N/A')     
-  , syscall_name_to_id.get('getdents'   , 'N/A')     
-  , syscall_name_to_id.get('getdents64' , 'N/A')     
-  , syscall_name_to_id.get('unlinkat'   , 'N/A')     
-  , syscall_name_to_id.get('fstat'      , 'N/A')
-  , syscall_name_to_id.get('fstatfs'    , 'N/A')
-  , syscall_name_to_id.get('newfstatat' , 'N/A')
-#  , syscall_name_to_id.get('openat'     , 'N/A')
-#  , syscall_name_to_id.get('openat2'     , 'N/A')
-  , syscall_name_to_id.get('readv'      , 'N/A')
-  , syscall_name_to_id.get('writev'     , 'N/A')
-  , syscall_name_to_id.get('preadv'     , 'N/A')
-  , syscall_name_to_id.get('pwritev'    , 'N/A')
-  , syscall_name_to_id.get('preadv2'    , 'N/A')
-  , syscall_name_to_id.get('pwritev2'   , 'N/A') 
-  , syscall_name_to_id.get('splice'     , 'N/A') 
-])
+syscalls_with_fd_arg = frozenset([syscall_name_to_id.get(name, 'N/A') for name in [
+    'read'
+  , 'write'
+  , 'pread64'
+  , 'pwrite64'
+  , 'fsync'
+  , 'fdatasync'
+  , 'recvfrom'
+  , 'sendto'
+  , 'recvmsg'
+  , 'sendmsg'
+  , 'epoll_wait'
+  , 'ioctl'
+  , 'accept'
+  , 'accept4'
+  , 'getdents'
+  , 'getdents64'
+  , 'unlinkat'
+  , 'fstat'
+  , 'fstatfs'
+  , 'newfstatat'
+#  , 'openat'
+#  , 'openat2'
+  , 'readv'
+  , 'writev'
+  , 'preadv'
+  , 'pwritev'
+  , 'preadv2'
+  , 'pwritev2'
+  , 'splice'
+]])
 
 special_fds = { 0:'(stdin) ', 1:'(stdout)', 2:'(stderr)' }
 
-syscalls_with_sint_arg = set([
-    syscall_name_to_id.get('wait4'      , 'N/A') # arg0 is pid_t
-  , syscall_name_to_id.get('waitpid'    , 'N/A')
-])
+syscalls_with_sint_arg = frozenset([syscall_name_to_id.get(name, 'N/A') for name in [
+    'wait4' # arg0 is pid_t
+  , 'waitpid'
+]])
 
 def parse_syscall_sample(proc_source, sample):
     tokens = sample.split()
@@ -411,6 +415,9 @@ def parse_syscall_sample(proc_source, sample):
 
 trim_socket = re.compile(r'\d+')
 
+# anonymous fd targets like socket:[12345] that get their inode numbers trimmed instead of path handling
+anon_fd_types = frozenset(['socket', 'pipe'])
+
 syscall = ProcSource('syscall', '/proc/%s/task/%s/syscall', [
     ('syscall_id', int,  0, lambda sn: -2 if sn == 'running' else int(sn)),
     ('syscall',    str,  0, lambda sn: syscall_id_to_name[sn]),  # convert syscall_id via unistd_64.h into call name
@@ -422,11 +429,11 @@ syscall = ProcSource('syscall', '/proc/%s/task/%s/syscall', [
     ('arg5',       str,  6),
     ('esp',        None, 7),                                        # stack pointer
     ('eip',        None, 8),                                        # program counter/instruction pointer
-    ('filename',   str,  9, lambda fn: re.sub(trim_socket, '*', fn) if fn.split(':')[0] in ['socket','pipe'] else fn),  
+    ('filename',   str,  9, lambda fn: trim_socket.sub('*', fn) if fn.split(':')[0] in anon_fd_types else fn),  
     ('filename2',  str,  9),  
-    ('filenamesum',str,  9, lambda fn: re.sub(trim_socket, '*', fn)),
-    ('basename',   str,  9, lambda fn: re.sub(trim_socket, '*', fn) if fn.split(':')[0] in ['socket','pipe'] else os.path.basename(fn)), # filename if syscall has fd as arg0
-    ('dirname',    str,  9, lambda fn: re.sub(trim_socket, '*', fn) if fn.split(':')[0] in ['socket','pipe'] else os.path.dirname(fn)),  # filename if syscall has fd as arg0
+    ('filenamesum',str,  9, lambda fn: trim_socket.sub('*', fn)),
+    ('basename',   str,  9, lambda fn: trim_socket.sub('*', fn) if fn.split(':')[0] in anon_fd_types else os.path.basename(fn)), # filename if syscall has fd as arg0
+    ('dirname',    str,  9, lambda fn: trim_socket.sub('*', fn) if fn.split(':')[0] in anon_fd_types else os.path.dirname(fn)),  # filename if syscall has fd as arg0
 ], None,
 task_level=True, parse_sample=parse_syscall_sample)
 
@@ -500,21 +507,22 @@ parse_sample=parse_net_sample)
 
 
 ### stack ###
+# syscall entry frames (x86_64 and aarch64) that are not shown in kstack
+stack_skip_funcs = frozenset(['entry_SYSCALL_64_after_hwframe','do_syscall_64','el0t_64_sync_handler',
+                              'el0_svc', 'do_el0_svc', 'el0_svc_common.constprop.0', 'invoke_syscall.constprop.0'])
+
 def read_stack_samples(fh):
-    result = ''
+    funcs = []
 
     # reverse stack and ignore the (reversed) top frame 0xfffffffffffff
     #                          |  |
     #                          v  v
     for x in fh.readlines()[::-1][1:]:
         func = x.split(' ')[1].split('+')[0]
-        if func not in ['entry_SYSCALL_64_after_hwframe','do_syscall_64','el0t_64_sync_handler', 
-                        'el0_svc', 'do_el0_svc', 'el0_svc_common.constprop.0', 'invoke_syscall.constprop.0' ]:
-            if result:          # skip writing the 1st "->" 
-                result += '->'  
-            result += func + '()'
+        if func not in stack_skip_funcs:
+            funcs.append(func + '()')
 
-    return [result or '-']
+    return ['->'.join(funcs) or '-']
 
 
 stack = ProcSource('stack', '/proc/%s/task/%s/stack', [
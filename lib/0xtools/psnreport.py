@@ -28,6 +28,35 @@ import logging
 def flatten(li):
     return [item for sublist in li for item in sublist]
 
+def unique(li):
+    # order-preserving, works for unhashable items too
+    return [item for i, item in enumerate(li) if item not in li[:i]]
+
+# every source table has these columns, they identify a sample and are used to join sources
+sample_key_columns = ('pid', 'task', 'event_time')
+
+# threads in these states are not doing anything, used for the 'active' and 'idle' report filters
+idle_filter_sql = "stat.state_id IN ('S', 'Z', 'I', 'P')"
+
+# report-level aggregates that don't come from any /proc source, %(num_sample_events)s is filled in by query()
+aggregate_columns = {
+    'samples': 'COUNT(1)',
+    'avg_threads': 'CAST(COUNT(1) AS REAL) / %(num_sample_events)s',
+}
+
+# case-insensitive column name -> (source, column name), when sources share a column the first one wins
+def build_source_column_index(sources):
+    index = {}
+    for s in sources:
+        for c in s.schema_columns:
+            index.setdefault(c[0].lower(), (s, c[0]))
+    return index
+
+source_column_index = build_source_column_index(proc.all_sources)
+
+# output types of report columns that don't come from a /proc source schema
+report_column_types = {'pid': int, 'task': int, 'samples': int, 'event_time': str, 'avg_threads': float}
+
 
 ### ASCII table output ###
 def output_table_report(report, dataset):
@@ -39,12 +68,8 @@ def output_table_report(report, dataset):
     if dataset:
         col_idx = 0
         for source, cols, expr, token in report.full_projection():
-            if token in ('pid', 'task', 'samples'):
-                col_type = int
-            elif token == 'event_time':
-                col_type = str
-            elif token == 'avg_threads':
-                col_type = float
+            if token in report_column_types:
+                col_type = report_column_types[token]
             elif cols:
                 col = [c for c in source.available_columns if c[0] == cols[0]][0]
                 col_type = col[1]
@@ -101,33 +126,29 @@ def output_table_report(report, dataset):
 class Report:
     def __init__(self, name, projection, dimensions=[], where=[], order=[], output_fn=output_table_report):
         def reify_column_token(col_token):
-            if col_token == 'samples':
-                return (None, [], 'COUNT(1)', col_token)
-            elif col_token == 'avg_threads':
-                return (None, [], 'CAST(COUNT(1) AS REAL) / %(num_sample_events)s', col_token)
-            elif col_token in ('pid', 'task', 'event_time'):
+            if col_token in aggregate_columns:
+                return (None, [], aggregate_columns[col_token], col_token)
+            elif col_token in sample_key_columns:
                 return ('first_source', [col_token], col_token, col_token)
 
-            for t in proc.all_sources:
-                for c in t.schema_columns:
-                    if col_token.lower() == c[0].lower():
-                        return (t, [c[0]], c[0], c[0])
+            source_column = source_column_index.get(col_token.lower())
+            if source_column:
+                t, col_name = source_column
+                return (t, [col_name], col_name, col_name)
 
             raise Exception('projection/dimension column %s not found.\nUse psn --list to see all available columns' % col_token)
 
         def process_filter_sql(filter_sql):
-            idle_filter = "stat.state_id IN ('S', 'Z', 'I', 'P')"
-
             if filter_sql == 'active':
-                return (proc.stat, ['state_id'], 'not(%s)' % idle_filter, filter_sql)
+                return (proc.stat, ['state_id'], 'not(%s)' % idle_filter_sql, filter_sql)
             elif filter_sql == 'idle':
-                return (proc.stat, ['state_id'], idle_filter, filter_sql)
+                return (proc.stat, ['state_id'], idle_filter_sql, filter_sql)
             else:
                 raise Exception('arbitrary filtering not implemented')
 
         self.name = name
         self.projection = [reify_column_token(t) for t in projection if t]
-        self.dimensions = [reify_column_token(t) for t in dimensions if t]
+        self.dimensions = unique([reify_column_token(t) for t in dimensions if t])
         self.order = [reify_column_token(t) for t in order if t]
         self.where = [process_filter_sql(t) for t in where if t]
         self.output_fn = output_fn
@@ -142,24 +163,33 @@ class Report:
         self.sources = {} # source -> [cols]
         for d in [self.projection, self.dimensions, self.order, self.where]:
             for source, column_names, expr, token in d:
-                source_columns = self.sources.get(source, ['pid', 'task', 'event_time'])
+                source_columns = self.sources.get(source, list(sample_key_columns))
                 source_columns.extend(column_names)
                 self.sources[source] = source_columns
         if None in self.sources:
             del self.sources[None]
 
+        # computed once, shared by query() and the output function
+        self.projected_columns = self.projection + [c for c in self.dimensions if c not in self.projection]
+
+        # report definition doesn't change after this point, so the SQL text is built only once
+        self.sql = None
+
 
     def full_projection(self):
-        return self.projection + [c for c in self.dimensions if c not in self.projection]
+        return self.projected_columns
 
 
     def query(self):
+        if self.sql:
+            return self.sql
+
         def render_col(c):
             return '%s.%s' % (c[0].name, c[2]) if c[0] else c[2]
 
         # build join conditions
         first_source_name = list(self.sources.keys())[0].name
-        join_where = flatten([['%s.%s = %s.%s' % (s.name, c, first_source_name, c) for c in ['pid', 'task', 'event_time']] for s in list(self.sources.keys())[1:]])
+        join_where = flatten([['%s.%s = %s.%s' % (s.name, c, first_source_name, c) for c in sample_key_columns] for s in list(self.sources.keys())[1:]])
 
         attr = {
             'projection': '\t' + ',\n\t'.join([render_col(c) for c in self.full_projection()]),
@@ -170,20 +200,21 @@ class Report:
             'num_sample_events': '(SELECT COUNT(DISTINCT(event_time)) FROM %s)' % first_source_name
         }
 
-        logging.debug('attr where=%s#end' % attr['where'])
+        logging.debug('attr where=%s#end', attr['where'])
 
-        sql = 'SELECT\n%(projection)s\nFROM\n%(tables)s' % attr
+        clauses = ['SELECT\n%(projection)s', 'FROM\n%(tables)s']
         # tanel changed from self.where to attr['where']
         # TODO think through the logic of using self.where vs attr.where (in the context of allowing pid/tid to be not part of group by)
         if attr['where'].strip():
-            sql += '\nWHERE\n%(where)s' % attr
-        if attr['dimensions']:
-            sql += '\nGROUP BY\n%(dimensions)s' % attr
-        if attr['order']:
-            sql += '\nORDER BY\n%(order)s' % attr
+            clauses.append('WHERE\n%(where)s')
+        if self.dimensions:
+            clauses.append('GROUP BY\n%(dimensions)s')
+        if self.order:
+            clauses.append('ORDER BY\n%(order)s')
 
         # final substitution allows things like avg_threads to work
-        return sql % attr
+        self.sql = ('\n'.join(clauses) % attr) % attr
+        return self.sql
 
 
     def dataset(self, conn):
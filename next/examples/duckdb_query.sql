@@ -30,6 +30,7 @@ WITH base_samples AS (
       , t.tid
       , t.sc_seq_num
       , COALESCE(c.duration_us, t.sc_us_so_far::int) as event_duration_us
+      , POWER(2, ROUND(LOG2(CASE WHEN event_duration_us <= 0 THEN 1 ELSE event_duration_us END)))::int lat_bucket_us
     FROM read_csv_auto('xcapture_samples.csv') AS t
     LEFT OUTER JOIN read_csv_auto('xcapture_sc_completion.csv') AS c ON 
         t.tid = c.tid AND 
@@ -44,9 +45,9 @@ SELECT
   , state
   , syscall_active
   , filename
-  , POWER(2, ROUND(LOG2(CASE WHEN event_duration_us <= 0 THEN 1 ELSE event_duration_us END)))::int lat_bucket_us
-  , ROUND(SUM(1000000 / event_duration_us)) est_evt_cnt
-  , ROUND(SUM(1000000 / event_duration_us) * POWER(2, ROUND(LOG2(CASE WHEN event_duration_us <= 0 THEN 1 ELSE event_duration_us END)))/1000000,3) est_evt_time_s
+  , lat_bucket_us
+  , ROUND(SUM(1000000 / event_duration_us) FILTER (WHERE event_duration_us > 0)) est_evt_cnt
+  , ROUND(SUM(1000000 / event_duration_us) FILTER (WHERE event_duration_us > 0) * lat_bucket_us / 1000000, 3) est_evt_time_s
   , bar(COUNT(*), 0, 25, 10) time_seconds_bar
   , COUNT(*) as seconds
 FROM base_samples
@@ -56,7 +57,7 @@ GROUP BY
   , state
   , syscall_active
   , filename
-  , POWER(2, ROUND(LOG2(CASE WHEN event_duration_us <= 0 THEN 1 ELSE event_duration_us END)))
+  , lat_bucket_us
 ORDER BY
     exe
   , comm